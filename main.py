@@ -1,20 +1,53 @@
-import time  # Imports the time module for handling time-related tasks.
+"""
+Sets up an advanced AI-powered financial analysis tool that can respond to user
+queries with specific financial data. It integrates OpenAI's GPT-3.5 model for
+conversational capabilities and uses the Financial Modeling Prep API to fetch
+real-time financial data. The application is designed to be interactive and
+user-friendly, providing detailed financial insights in response to user inputs.
+"""
+
 import openai  # Imports the OpenAI library for accessing OpenAI's API.
 from dotenv import (
     load_dotenv,
     find_dotenv,
 )  # Imports functions to handle environment variables.
 import requests  # Imports the requests module for making HTTP requests.
+import requests_cache  # Imports requests-cache for a persistent HTTP response cache.
+from requests.adapters import HTTPAdapter  # Imports the adapter used to pool connections.
+from urllib3.util.retry import Retry  # Imports the retry policy for transient HTTP errors.
 import json  # Imports the json module for JSON manipulation.
 import os  # Imports the os module to interact with the operating system.
+import functools  # Imports functools for caching function results.
+import inspect  # Imports inspect to validate tool call arguments.
+import threading  # Imports threading to guard the shared response cache.
+from cachetools import TTLCache, cached  # Imports the TTL cache for FMP responses.
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)  # Imports the thread pool used to run tool calls concurrently.
 
 # OpenAI specific imports for handling various types and structures.
 from openai.types.beta import Assistant
 from openai.types.beta.thread import Thread
-from openai.types.beta.threads.thread_message import ThreadMessage
+from openai.types.beta.threads.message import Message
 from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
 from openai.types.beta.threads.run import Run
 
+# Uses orjson for faster JSON (de)serialization when it is installed,
+# falling back to the standard json module otherwise.
+try:
+    import orjson
+
+    def _json_loads(data: str | bytes):
+        return orjson.loads(data)
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 # Read local .env file to load environment variables (like API keys).
 _: bool = load_dotenv(find_dotenv())  # read local .env file
 
@@ -24,130 +57,252 @@ FMP_API_KEY: str | None = os.getenv("FMP_API_KEY")
 # Initializes an OpenAI client.
 client: openai.OpenAI = openai.OpenAI()
 
+# Maximum number of concurrent FMP requests, shared by the connection pool
+# and the tool-call worker pool so every worker can hold a connection.
+_FMP_MAX_CONNECTIONS: int = 16
+
+# Shares one HTTP session across all FMP calls so keep-alive connections to
+# financialmodelingprep.com are reused instead of paying a new TCP + TLS
+# handshake on every tool invocation. Responses are also stored in a local
+# SQLite cache; the API key is ignored in the cache key so entries are shared
+# across users and restarts, and the key is never written to the cache.
+_SESSION: requests_cache.CachedSession = requests_cache.CachedSession(
+    "fmp_cache", backend="sqlite", expire_after=3600, ignored_parameters=["apikey"]
+)
+# All requests go to a single host, so one pool is kept with up to
+# _FMP_MAX_CONNECTIONS reusable sockets.
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=_FMP_MAX_CONNECTIONS,
+        max_retries=Retry(
+            total=3,
+            connect=2,
+            read=2,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+        ),
+    ),
+)
+# Requests compressed responses; brotli decoding needs the brotli package.
+_SESSION.headers.update({"Accept-Encoding": "gzip, br", "Connection": "keep-alive"})
+
+# Shares one worker pool across all runs so concurrent users reuse the same
+# threads instead of spawning a new pool per turn.
+_TOOL_EXECUTOR: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=_FMP_MAX_CONNECTIONS
+)
+
+# Connect and read timeouts (in seconds) applied to every FMP request.
+_FMP_TIMEOUT: tuple[float, float] = (3.05, 15)
+
+# Requests with a limit above this return payloads of hundreds of kilobytes,
+# so they get a longer read timeout.
+_FMP_LARGE_LIMIT: int = 20
+_FMP_LARGE_TIMEOUT: tuple[float, float] = (3.05, 30)
+
+# Caches FMP responses for an hour, since fundamentals only change on earnings.
+_fmp_cache: TTLCache = TTLCache(maxsize=512, ttl=3600)
+
 
 # Define functions to retrieve financial data using the Financial Modeling Prep API.
 # Each function takes a stock ticker, a period (annual/quarterly), and a limit as arguments
 # and returns the requested financial data in JSON format.
 
 
-def get_income_statement(ticker: str, period: str, limit: int) -> str:
-    # Function to get income statement data.
-    # Constructs the request URL with parameters and sends a GET request.
-    # Returns the response in JSON format.
+@cached(_fmp_cache, lock=threading.Lock())
+def _fetch_fmp_symbol(endpoint: str, ticker: str, period: str, limit: int) -> str:
     """
-    Retrieves income statement data for a given stock ticker.
+    Retrieves data for one ticker from a Financial Modeling Prep endpoint,
+    caching the result.
 
     Args:
+        endpoint (str): The FMP endpoint name (e.g., 'income-statement').
         ticker (str): Stock ticker symbol.
         period (str): The period (e.g., 'annual' or 'quarterly').
         limit (int): The maximum number of records to retrieve.
 
+    Returns:
+        str: JSON string containing the endpoint data.
+    """
+    url: str = f"https://financialmodelingprep.com/api/v3/{endpoint}/{ticker}"
+    # Passes the API key as a parameter rather than in the URL, so it can be
+    # left out of the response cache key.
+    params: dict = {"period": period, "limit": limit, "apikey": FMP_API_KEY}
+    timeout: tuple[float, float] = (
+        _FMP_LARGE_TIMEOUT if limit and limit > _FMP_LARGE_LIMIT else _FMP_TIMEOUT
+    )
+    response: requests.Response = _SESSION.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    # FMP already returns JSON text, so it is passed through without re-parsing.
+    return response.text
+
+
+def _merge_records(payloads: list[str]) -> str:
+    """
+    Merges the JSON responses fetched for several tickers into one JSON array.
+
+    Args:
+        payloads (list[str]): JSON strings returned for each ticker.
+
+    Returns:
+        str: JSON string containing the records of every ticker.
+    """
+    records: list = []
+    for payload in payloads:
+        data = _json_loads(payload)
+        # FMP reports some errors as a JSON object rather than a list of records.
+        if isinstance(data, list):
+            records.extend(data)
+        else:
+            records.append(data)
+    return _json_dumps(records)
+
+
+def _fetch_fmp(
+    endpoint: str, ticker: str | list[str], period: str, limit: int
+) -> str:
+    """
+    Retrieves data for one or more tickers from a Financial Modeling Prep endpoint.
+
+    The statement endpoints take a single symbol, so a list of tickers is
+    fetched one cached request per ticker and the records are merged into a
+    single JSON array. Each record carries its own 'symbol' field, and limit
+    applies per ticker. Tool calls expand a list of tickers before reaching
+    this function, so their per-ticker requests run concurrently.
+
+    Args:
+        endpoint (str): The FMP endpoint name (e.g., 'income-statement').
+        ticker (str | list[str]): A ticker symbol or a list of ticker symbols.
+        period (str): The period (e.g., 'annual' or 'quarterly').
+        limit (int): The maximum number of records to retrieve per ticker.
+
+    Returns:
+        str: JSON string containing the endpoint data.
+    """
+    if isinstance(ticker, str):
+        return _fetch_fmp_symbol(endpoint, ticker, period, limit)
+    if isinstance(ticker, list):
+        return _merge_records(
+            [_fetch_fmp_symbol(endpoint, symbol, period, limit) for symbol in ticker]
+        )
+    raise TypeError("ticker must be a string or a list of strings")
+
+
+def get_income_statement(
+    ticker: str | list[str], period: str = "annual", limit: int = 5
+) -> str:
+    # Function to get income statement data.
+    # Returns the response in JSON format, served from the cache when possible.
+    """
+    Retrieves income statement data for a given stock ticker.
+
+    Args:
+        ticker (str | list[str]): Stock ticker symbol, or a list of symbols.
+        period (str): The period (e.g., 'annual' or 'quarterly'). Defaults to 'annual'.
+        limit (int): The maximum number of records to retrieve. Defaults to 5.
+
     Returns:
         str: JSON string containing income statement data.
     """
-    url: str = f"https://financialmodelingprep.com/api/v3/income-statement/{ticker}?period={period}&limit={limit}&apikey={FMP_API_KEY}"
-    response: requests.Response = requests.get(url)
-    return json.dumps(response.json())
+    return _fetch_fmp("income-statement", ticker, period, limit)
 
 
-def get_balance_sheet(ticker: str, period: str, limit: int) -> str:
+def get_balance_sheet(
+    ticker: str | list[str], period: str = "annual", limit: int = 5
+) -> str:
     # Function to get balance sheet data.
-    # Constructs the request URL with parameters and sends a GET request.
-    # Returns the response in JSON format.
+    # Returns the response in JSON format, served from the cache when possible.
     """
     Retrieves the balance sheet statement for a given ticker.
 
     Args:
-        ticker (str): The ticker symbol of the company.
-        period (str): The period of the balance sheet statement (e.g., 'annual', 'quarter').
-        limit (int): The number of periods to retrieve.
+        ticker (str | list[str]): The ticker symbol of the company, or a list of symbols.
+        period (str): The period of the balance sheet statement (e.g., 'annual', 'quarter'). Defaults to 'annual'.
+        limit (int): The number of periods to retrieve. Defaults to 5.
 
     Returns:
         str: The balance sheet statement in JSON format.
     """
-    url: str = f"https://financialmodelingprep.com/api/v3/balance-sheet-statement/{ticker}?period={period}&limit={limit}&apikey={FMP_API_KEY}"
-    response: requests.Response = requests.get(url)
-    return json.dumps(response.json())
+    return _fetch_fmp("balance-sheet-statement", ticker, period, limit)
 
 
-def get_cash_flow_statement(ticker: str, period: str, limit: int) -> str:
+def get_cash_flow_statement(
+    ticker: str | list[str], period: str = "annual", limit: int = 5
+) -> str:
     # Function to get cash flow statement data.
-    # Constructs the request URL with parameters and sends a GET request.
-    # Returns the response in JSON format.
+    # Returns the response in JSON format, served from the cache when possible.
     """
     Retrieves the cash flow statement for a given ticker.
 
     Args:
-        ticker (str): The ticker symbol of the company.
-        period (str): The period for which the cash flow statement is requested (e.g., annual, quarterly).
-        limit (int): The number of periods to retrieve.
+        ticker (str | list[str]): The ticker symbol of the company, or a list of symbols.
+        period (str): The period for which the cash flow statement is requested (e.g., annual, quarterly). Defaults to 'annual'.
+        limit (int): The number of periods to retrieve. Defaults to 5.
 
     Returns:
         str: The cash flow statement in JSON format.
     """
-    url: str = f"https://financialmodelingprep.com/api/v3/cash-flow-statement/{ticker}?period={period}&limit={limit}&apikey={FMP_API_KEY}"
-    response: requests.Response = requests.get(url)
-    return json.dumps(response.json())
+    return _fetch_fmp("cash-flow-statement", ticker, period, limit)
 
 
-def get_key_metrics(ticker: str, period: str, limit: int) -> str:
+def get_key_metrics(
+    ticker: str | list[str], period: str = "annual", limit: int = 5
+) -> str:
     # Function to get key metrics for a company.
-    # Constructs the request URL with parameters and sends a GET request.
-    # Returns the response in JSON format.
+    # Returns the response in JSON format, served from the cache when possible.
     """
     Retrieves key metrics for a given ticker.
 
     Args:
-        ticker (str): The ticker symbol of the company.
-        period (str): The period for which key metrics are retrieved.
-        limit (int): The maximum number of key metrics to retrieve.
+        ticker (str | list[str]): The ticker symbol of the company, or a list of symbols.
+        period (str): The period for which key metrics are retrieved. Defaults to 'annual'.
+        limit (int): The maximum number of key metrics to retrieve. Defaults to 5.
 
     Returns:
         str: A JSON string containing the key metrics data.
     """
-    url: str = f"https://financialmodelingprep.com/api/v3/key-metrics/{ticker}?period={period}&limit={limit}&apikey={FMP_API_KEY}"
-    response: requests.Response = requests.get(url)
-    return json.dumps(response.json())
+    return _fetch_fmp("key-metrics", ticker, period, limit)
 
 
-def get_financial_ratios(ticker: str, period: str, limit: int) -> str:
+def get_financial_ratios(
+    ticker: str | list[str], period: str = "annual", limit: int = 5
+) -> str:
     # Function to get financial ratios.
-    # Constructs the request URL with parameters and sends a GET request.
-    # Returns the response in JSON format.
+    # Returns the response in JSON format, served from the cache when possible.
     """
     Retrieves financial ratios for a given ticker.
 
     Args:
-        ticker (str): The ticker symbol of the company.
-        period (str): The period for which the ratios are requested (e.g., annual, quarterly).
-        limit (int): The maximum number of ratios to retrieve.
+        ticker (str | list[str]): The ticker symbol of the company, or a list of symbols.
+        period (str): The period for which the ratios are requested (e.g., annual, quarterly). Defaults to 'annual'.
+        limit (int): The maximum number of ratios to retrieve. Defaults to 5.
 
     Returns:
         str: A JSON string containing the financial ratios.
     """
-    url: str = f"https://financialmodelingprep.com/api/v3/ratios/{ticker}?period={period}&limit={limit}&apikey={FMP_API_KEY}"
-    response: requests.Response = requests.get(url)
-    return json.dumps(response.json())
+    return _fetch_fmp("ratios", ticker, period, limit)
 
 
-def get_financial_growth(ticker: str, period: str, limit: int) -> str:
+def get_financial_growth(
+    ticker: str | list[str], period: str = "annual", limit: int = 5
+) -> str:
     # Function to get financial growth data.
-    # Constructs the request URL with parameters and sends a GET request.
-    # Returns the response in JSON format.
+    # Returns the response in JSON format, served from the cache when possible.
     """
     Retrieves the cash flow statement growth data for a given ticker.
 
     Args:
-        ticker (str): The ticker symbol of the company.
-        period (str): The time period for the data (e.g., 'annual', 'quarter').
-        limit (int): The number of records to retrieve.
+        ticker (str | list[str]): The ticker symbol of the company, or a list of symbols.
+        period (str): The time period for the data (e.g., 'annual', 'quarter'). Defaults to 'annual'.
+        limit (int): The number of records to retrieve. Defaults to 5.
 
     Returns:
         str: The JSON string representation of the response data.
     """
-    url: str = f"https://financialmodelingprep.com/api/v3/cash-flow-statement-growth/{ticker}?period={period}&limit={limit}&apikey={FMP_API_KEY}"
-    response: requests.Response = requests.get(url)
-    return json.dumps(response.json())
+    return _fetch_fmp("cash-flow-statement-growth", ticker, period, limit)
 
 
 # A dictionary mapping function names to their corresponding functions.
@@ -161,108 +316,268 @@ available_functions: dict = {
 }
 
 
-# Defines a function to run the OpenAI assistant.
-def run_assistant(user_message: str):
-    # Creates an OpenAI assistant instance with specific instructions and tools.
-    # Each tool corresponds to a financial data retrieval function.
-    assistant: Assistant = client.beta.assistants.create(
-        instructions="Act as a financial analyst by accessing detailed financial data through the Financial Modeling Prep API. Your capabilities include analyzing key metrics, comprehensive financial statements, vital financial ratios, and tracking financial growth trends. ",
-        model="gpt-3.5-turbo-1106",
-        tools=[
-            # The first tool is a function that retrieves income statement data
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_income_statement",
-                    "description": "Retrieves income statement data for a given stock ticker.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "ticker": {"type": "string"},
-                            "period": {"type": "string"},
-                            "limit": {"type": "integer"},
-                        },
-                        "required": ["ticker"],
+# Instructions and model used to create the financial analyst assistant.
+_INSTRUCTIONS: str = "Act as a financial analyst by accessing detailed financial data through the Financial Modeling Prep API. Your capabilities include analyzing key metrics, comprehensive financial statements, vital financial ratios, and tracking financial growth trends. When comparing multiple companies, pass `ticker` as a JSON array in one call."
+_MODEL: str = "gpt-3.5-turbo-1106"
+
+# The tools exposed to the assistant, built once at import time.
+# Each tool corresponds to a financial data retrieval function.
+_TOOLS: tuple[dict, ...] = (
+    # The first tool is a function that retrieves income statement data
+    {
+        "type": "function",
+        "function": {
+            "name": "get_income_statement",
+            "description": "Retrieves income statement data for a given stock ticker.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ticker": {
+                        "oneOf": [
+                            {"type": "string"},
+                            {"type": "array", "items": {"type": "string"}},
+                        ]
                     },
+                    "period": {"type": "string"},
+                    "limit": {"type": "integer"},
                 },
+                "required": ["ticker"],
             },
-            # The second tool is a function that retrieves balance sheet data
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_balance_sheet",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "ticker": {"type": "string"},
-                            "period": {"type": "string"},
-                            "limit": {"type": "integer"},
-                        },
+        },
+    },
+    # The second tool is a function that retrieves balance sheet data
+    {
+        "type": "function",
+        "function": {
+            "name": "get_balance_sheet",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ticker": {
+                        "oneOf": [
+                            {"type": "string"},
+                            {"type": "array", "items": {"type": "string"}},
+                        ]
                     },
+                    "period": {"type": "string"},
+                    "limit": {"type": "integer"},
                 },
+                "required": ["ticker"],
             },
-            # The third tool is a function that retrieves cash flow statement data
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_cash_flow_statement",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "ticker": {"type": "string"},
-                            "period": {"type": "string"},
-                            "limit": {"type": "integer"},
-                        },
+        },
+    },
+    # The third tool is a function that retrieves cash flow statement data
+    {
+        "type": "function",
+        "function": {
+            "name": "get_cash_flow_statement",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ticker": {
+                        "oneOf": [
+                            {"type": "string"},
+                            {"type": "array", "items": {"type": "string"}},
+                        ]
                     },
+                    "period": {"type": "string"},
+                    "limit": {"type": "integer"},
                 },
+                "required": ["ticker"],
             },
-            # The fourth tool is a function that retrieves key metrics
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_key_metrics",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "ticker": {"type": "string"},
-                            "period": {"type": "string"},
-                            "limit": {"type": "integer"},
-                        },
+        },
+    },
+    # The fourth tool is a function that retrieves key metrics
+    {
+        "type": "function",
+        "function": {
+            "name": "get_key_metrics",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ticker": {
+                        "oneOf": [
+                            {"type": "string"},
+                            {"type": "array", "items": {"type": "string"}},
+                        ]
                     },
+                    "period": {"type": "string"},
+                    "limit": {"type": "integer"},
                 },
+                "required": ["ticker"],
             },
-            # The fifth tool is a function that retrieves financial ratios
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_financial_ratios",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "ticker": {"type": "string"},
-                            "period": {"type": "string"},
-                            "limit": {"type": "integer"},
-                        },
+        },
+    },
+    # The fifth tool is a function that retrieves financial ratios
+    {
+        "type": "function",
+        "function": {
+            "name": "get_financial_ratios",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ticker": {
+                        "oneOf": [
+                            {"type": "string"},
+                            {"type": "array", "items": {"type": "string"}},
+                        ]
                     },
+                    "period": {"type": "string"},
+                    "limit": {"type": "integer"},
                 },
+                "required": ["ticker"],
             },
-            # The sixth tool is a function that retrieves financial growth data
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_financial_growth",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "ticker": {"type": "string"},
-                            "period": {"type": "string"},
-                            "limit": {"type": "integer"},
-                        },
+        },
+    },
+    # The sixth tool is a function that retrieves financial growth data
+    {
+        "type": "function",
+        "function": {
+            "name": "get_financial_growth",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ticker": {
+                        "oneOf": [
+                            {"type": "string"},
+                            {"type": "array", "items": {"type": "string"}},
+                        ]
                     },
+                    "period": {"type": "string"},
+                    "limit": {"type": "integer"},
                 },
+                "required": ["ticker"],
             },
-        ],
+        },
+    },
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_assistant() -> Assistant:
+    """
+    Creates the financial analyst assistant once and reuses it afterwards.
+
+    Returns:
+        Assistant: The assistant configured with the financial data tools.
+    """
+    return client.beta.assistants.create(
+        instructions=_INSTRUCTIONS, model=_MODEL, tools=_TOOLS
     )
+
+
+def _parse_tool_args(function_to_call, arguments: str) -> dict:
+    """
+    Decodes the arguments of a tool call and checks them against the fetcher.
+
+    Args:
+        function_to_call: The fetcher the tool call maps to.
+        arguments (str): The JSON arguments sent by the assistant.
+
+    Returns:
+        dict: The keyword arguments to call the fetcher with.
+
+    Raises:
+        ValueError: If the arguments are not valid JSON or limit is not an integer.
+        TypeError: If the arguments do not match the fetcher's parameters.
+    """
+    function_args = _json_loads(arguments)
+    inspect.signature(function_to_call).bind(**function_args)
+    ticker = function_args["ticker"]
+    if not (
+        isinstance(ticker, str)
+        or (
+            isinstance(ticker, list)
+            and ticker
+            and all(isinstance(symbol, str) for symbol in ticker)
+        )
+    ):
+        raise TypeError("ticker must be a string or a non-empty list of strings")
+    # The assistant may send limit as a string (e.g. "10"), which the fetchers
+    # compare numerically, so it is converted here.
+    if "limit" in function_args:
+        function_args["limit"] = int(function_args["limit"])
+    return function_args
+
+
+def _build_tool_outputs(run: Run) -> list[ToolOutput]:
+    """
+    Executes the tool calls requested by a run and collects their outputs.
+
+    Args:
+        run (Run): A run whose status is 'requires_action'.
+
+    Returns:
+        list[ToolOutput]: One output per requested tool call, in order.
+    """
+    toolCalls = run.required_action.submit_tool_outputs.tool_calls
+    tool_outputs: list[ToolOutput] = []
+    # Executes the required tool calls concurrently, since each one
+    # is an independent HTTP request to the FMP API. A list of tickers is
+    # expanded into one request per ticker, and their records are merged.
+    # Calls that cannot be made get an error output instead, since the run
+    # cannot continue until every tool call has been answered.
+    results: list[list[Future] | str] = []
+    merged: list[bool] = []
+    for toolcall in toolCalls:
+        function_name = toolcall.function.name
+        function_to_call = available_functions.get(function_name)
+        merged.append(False)
+        if function_to_call is None:
+            results.append(_json_dumps({"error": f"unknown tool {function_name}"}))
+            continue
+        # Decodes and validates the arguments up front, so malformed JSON or
+        # missing arguments are reported to the assistant.
+        try:
+            function_args = _parse_tool_args(
+                function_to_call, toolcall.function.arguments
+            )
+        except (ValueError, TypeError) as e:
+            results.append(
+                _json_dumps({"error": f"invalid arguments for {function_name}: {e}"})
+            )
+            continue
+        ticker = function_args["ticker"]
+        if isinstance(ticker, list):
+            merged[-1] = True
+            results.append(
+                [
+                    _TOOL_EXECUTOR.submit(
+                        function_to_call, **{**function_args, "ticker": symbol}
+                    )
+                    for symbol in ticker
+                ]
+            )
+        else:
+            results.append([_TOOL_EXECUTOR.submit(function_to_call, **function_args)])
+    # Captures one output per tool call, keeping their order.
+    # Network failures are reported the same way, so the assistant can recover.
+    for toolcall, result, merge in zip(toolCalls, results, merged):
+        if isinstance(result, str):
+            output = result
+        else:
+            try:
+                payloads = [future.result() for future in result]
+                output = _merge_records(payloads) if merge else payloads[0]
+            except requests.RequestException as e:
+                # The exception text includes the request URL and its API key,
+                # so only the exception type and status code are reported.
+                error: dict = {"error": type(e).__name__}
+                if e.response is not None:
+                    error["status_code"] = e.response.status_code
+                output = _json_dumps(error)
+            except Exception as e:
+                # Any other failure (e.g. from the response cache) is reported
+                # by type only, so every tool call still gets an output.
+                output = _json_dumps({"error": type(e).__name__})
+        tool_outputs.append({"tool_call_id": toolcall.id, "output": output})
+    return tool_outputs
+
+
+# Defines a function to run the OpenAI assistant.
+def run_assistant(user_message: str):
+    # Retrieves the cached assistant instance.
+    assistant: Assistant = _get_assistant()
     # Creates a new thread for handling the conversation.
     thread: Thread = client.beta.threads.create()
 
@@ -270,72 +585,27 @@ def run_assistant(user_message: str):
     message = client.beta.threads.messages.create(
         thread_id=thread.id, role="user", content=user_message
     )
-    # Starts running the assistant on the thread.
-    run: Run = client.beta.threads.runs.create(
+    # Starts running the assistant on the thread and waits until it needs
+    # action or reaches a terminal state, using the SDK's polling helper.
+    run: Run = client.beta.threads.runs.create_and_poll(
         thread_id=thread.id, assistant_id=assistant.id
     )
-    # Enters a loop to handle the assistant's responses and actions.
-    while True:
-        # Retrieves the current status of the run.
-        runStatus = client.beta.threads.runs.retrieve(
-            thread_id=thread.id, run_id=run.id
+    # Handles cases where the assistant requires action (like calling a function),
+    # submitting the tool outputs and waiting for the next state.
+    while run.status == "requires_action":
+        run = client.beta.threads.runs.submit_tool_outputs_and_poll(
+            thread_id=thread.id, run_id=run.id, tool_outputs=_build_tool_outputs(run)
         )
 
-        # Handles cases where the assistant requires action (like calling a function).
-        if (
-            runStatus.status == "requires_action"
-            and runStatus.required_action is not None
-        ):
-            if (
-                runStatus.required_action.submit_tool_outputs
-                and runStatus.required_action.submit_tool_outputs.tool_calls
-            ):
-                toolCalls = runStatus.required_action.submit_tool_outputs.tool_calls
-                tool_outputs: list[ToolOutput] = []
-                # Loops through required tool calls.
-                for toolcall in toolCalls:
-                    # Executes the corresponding function and captures the output.
-                    function_name = toolcall.function.name
-                    function_args = json.loads(toolcall.function.arguments)
-
-                    if function_name in available_functions:
-                        function_to_call = available_functions[function_name]
-                        response = function_to_call(**function_args)
-                        tool_outputs.append(
-                            {
-                                "tool_call_id": toolcall.id,
-                                "output": response,
-                            }
-                        )
-
-                # Submits the tool outputs back to the assistant.
-                client.beta.threads.runs.submit_tool_outputs(
-                    thread_id=thread.id, run_id=run.id, tool_outputs=tool_outputs
-                )
-        # Handles the case where the assistant's run is completed.
-        elif runStatus.status == "completed":
-            # Retrieves and returns the final messages from the assistant.
-
-            messages: list[ThreadMessage] = client.beta.threads.messages.list(
-                thread_id=thread.id
-            )
-            for message in messages.data:
-                message_content = message.content[0].text.value
-                return message_content
-            break  # Exit the loop after processing the completed run
-        # Handles other statuses like 'failed', 'in_progress', or 'queued'.
-
-        elif run.status == "failed":
-            print("Run failed.")
-            break
-
-        elif run.status in ["in_progress", "queued"]:
-            print(f"Run is {run.status}. Waiting...")
-            time.sleep(5)  # Wait for 5 seconds before checking again
-
-        else:
-            print(f"Unexpected status: {run.status}")
-            break
-
-
-# The code above sets up an advanced AI-powered financial analysis tool that can respond to user queries with specific financial data. It integrates OpenAI's GPT-3.5 model for conversational capabilities and uses the Financial Modeling Prep API to fetch real-time financial data. The application is designed to be interactive and user-friendly, providing detailed financial insights in response to user inputs.
+    # Handles the case where the assistant's run is completed.
+    if run.status == "completed":
+        # Retrieves and returns only the newest message, which is the assistant's reply.
+        messages: list[Message] = client.beta.threads.messages.list(
+            thread_id=thread.id, limit=1, order="desc"
+        )
+        return messages.data[0].content[0].text.value
+    # Handles other terminal statuses like 'failed', 'cancelled' or 'expired'.
+    elif run.status == "failed":
+        print("Run failed.")
+    else:
+        print(f"Unexpected status: {run.status}")
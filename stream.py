@@ -1,8 +1,11 @@
+from collections import deque
+
 import streamlit as st
 import main
 
+# Keeps only the most recent messages, so each rerun renders a bounded history.
 if "conversation" not in st.session_state:
-    st.session_state.conversation = []
+    st.session_state.conversation = deque(maxlen=50)
 
 
 def app():
@@ -14,28 +17,22 @@ def app():
     conversation = st.session_state.conversation
 
     for message in conversation:
-        if message["role"] == "user":
-            st.write("You:", message["content"])
-        elif message["role"] == "AI":
-            st.write("AI:", message["content"])
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
 
     user_input = st.chat_input(
         placeholder="Ask me anything about finance interested in!"
     )
 
     if user_input:
-        st.write("You:", user_input)
-        conversation.append(
-            {"role": "user", "content": user_input, "id": len(conversation)}
-        )
-        st.session_state.conversation = conversation
-        with st.spinner("Wait for it..."):
-            ai_response = main.run_assistant(user_input)
-            st.write("AI:", ai_response)
-            conversation.append(
-                {"role": "AI", "content": ai_response, "id": len(conversation)}
-            )
-            st.session_state.conversation = conversation
+        with st.chat_message("user"):
+            st.markdown(user_input)
+        conversation.append({"role": "user", "content": user_input})
+        with st.chat_message("assistant"):
+            with st.spinner("Wait for it..."):
+                ai_response = main.run_assistant(user_input)
+            st.markdown(ai_response)
+        conversation.append({"role": "assistant", "content": ai_response})
 
 
 if __name__ == "__main__":